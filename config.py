@@ -34,6 +34,10 @@ API_CONFIG = {
         "rate_limit_delay": 0.2,  # Reduced from 0.5s to 0.2s (not used in current flow)
         "max_results": 10,  # Get more results to filter out login pages
         "search_depth": "advanced",  # Use advanced search for better results
+        "miss_ttl_days": 30,  # Re-search products with no result after this many days
+        "cache_save_every": 50,  # Flush the URL cache log after this many new entries (and on close)
+        "batch_workers": 8,  # Concurrent searches in search_urls_batch (request starts stay rate limited)
+        "parallel_queries": False,  # Send all query variants of a product at once (faster misses, up to 5x API quota)
     },
     "firecrawl": {
         "endpoint": "https://api.firecrawl.dev/v1/scrape",
@@ -3,6 +3,7 @@ Direct CSV Converter - No API calls needed
 Converts input CSV with all data directly to Shopify format
 """
 import pandas as pd
+import csv
 import re
 import unicodedata
 import logging
@@ -17,16 +18,40 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def sanitize_handle(text: str) -> str:
-    """Convert text to Shopify-compliant handle"""
-    text = text.lower()
-    text = ''.join(
+def _strip_marks(text: str) -> str:
+    """Drop combining marks after NFD decomposition ("é" -> "e")"""
+    return ''.join(
         c for c in unicodedata.normalize('NFD', text)
         if unicodedata.category(c) != 'Mn'
     )
-    text = re.sub(r'[^a-z0-9\s\-]', '', text)
-    text = re.sub(r'\s+', '-', text)
-    text = re.sub(r'-+', '-', text)
+
+
+# Accented Latin letters (Latin-1 Supplement through Latin Extended-B) mapped
+# straight to their ASCII base letter, so common names skip the per-char loop
+_ACCENT_MAP = str.maketrans({
+    chr(cp): _strip_marks(chr(cp))
+    for cp in range(0xC0, 0x250)
+    if _strip_marks(chr(cp)) != chr(cp) and _strip_marks(chr(cp)).isascii()
+})
+
+_RE_CLEAN_HANDLE = re.compile(r'[a-z0-9]+(?:-[a-z0-9]+)*')
+_RE_NON_HANDLE = re.compile(r'[^a-z0-9\s\-]')
+_RE_SEPARATORS = re.compile(r'[\s\-]+')
+
+
+def sanitize_handle(text: str) -> str:
+    """Convert text to Shopify-compliant handle"""
+    text = text.lower()
+    if text.isascii():
+        if _RE_CLEAN_HANDLE.fullmatch(text):
+            return text[:255]  # Already a valid handle
+    else:
+        text = text.translate(_ACCENT_MAP)
+        if not text.isascii():
+            # Other scripts / pre-composed marks: fall back to the full decomposition
+            text = _strip_marks(text)
+    text = _RE_NON_HANDLE.sub('', text)
+    text = _RE_SEPARATORS.sub('-', text)  # Whitespace and hyphen runs -> one hyphen
     text = text.strip('-')
     return text[:255] if text else 'product'
 
@@ -68,6 +93,8 @@ def convert_to_shopify(input_file: str, output_file: str):
     # Prepare Shopify rows
     shopify_rows = []
     seen_handles = set()
+    # Last counter suffix used per base handle, so duplicates don't rescan from -1
+    handle_counters = {}
     
     logger.info("\n🔄 Converting to Shopify format...")
     
@@ -78,6 +105,8 @@ def convert_to_shopify(input_file: str, output_file: str):
         english_desc = str(row['English Description']).strip()
         arabic_desc = str(row.get('Arabic Description', '')).strip()
         cost = float(row.get('COST', 0))
+        if pd.isna(cost):
+            cost = ''  # Missing cost stays a blank cell
         tax = str(row.get('TAX  ', '')).strip()
         category = str(row.get('Category', 'Other')).strip()
         sub_category = str(row.get('Sub Category', '')).strip()
@@ -87,14 +116,18 @@ def convert_to_shopify(input_file: str, output_file: str):
         image2_urls = parse_image_urls(row.get('Image 2 URL'))
         image3_urls = parse_image_urls(row.get('Image 3 URL'))
         all_images = image1_urls + image2_urls + image3_urls
+        first_image = all_images[0] if all_images else ''
         
         # Generate unique handle
         base_handle = sanitize_handle(f"{brand}-{english_desc}")
         handle = base_handle
-        counter = 1
-        while handle in seen_handles:
+        if handle in seen_handles:
+            counter = handle_counters.get(base_handle, 0) + 1
             handle = f"{base_handle}-{counter}"
-            counter += 1
+            while handle in seen_handles:
+                counter += 1
+                handle = f"{base_handle}-{counter}"
+            handle_counters[base_handle] = counter
         seen_handles.add(handle)
         
         # Create description (English + Arabic)
@@ -132,7 +165,7 @@ def convert_to_shopify(input_file: str, output_file: str):
             'Variant Requires Shipping': 'TRUE',
             'Variant Taxable': taxable,
             'Variant Barcode': upc,
-            'Image Src': all_images[0] if all_images else '',
+            'Image Src': first_image,
             'Image Position': 1 if all_images else '',
             'Image Alt Text': english_desc,
             'Gift Card': 'FALSE',
@@ -149,7 +182,7 @@ def convert_to_shopify(input_file: str, output_file: str):
             'Google Shopping / Custom Label 2': '',
             'Google Shopping / Custom Label 3': '',
             'Google Shopping / Custom Label 4': '',
-            'Variant Image': all_images[0] if all_images else '',
+            'Variant Image': first_image,
             'Variant Weight Unit': 'kg',
             'Variant Tax Code': '',
             'Cost per item': cost,
@@ -161,25 +194,30 @@ def convert_to_shopify(input_file: str, output_file: str):
         shopify_rows.append(first_row)
         
         # Additional image rows (if more than 1 image)
-        for img_idx in range(1, len(all_images)):
-            image_row = {col: '' for col in first_row.keys()}
-            image_row['Handle'] = handle
-            image_row['Image Src'] = all_images[img_idx]
-            image_row['Image Position'] = img_idx + 1
-            image_row['Image Alt Text'] = english_desc
-            shopify_rows.append(image_row)
+        if len(all_images) > 1:
+            # Fields shared by this product's image rows, built once
+            image_base = dict.fromkeys(first_row, '') | {
+                'Handle': handle,
+                'Image Alt Text': english_desc,
+            }
+            for img_idx in range(1, len(all_images)):
+                shopify_rows.append(image_base | {
+                    'Image Src': all_images[img_idx],
+                    'Image Position': img_idx + 1,
+                })
         
         if (idx + 1) % 500 == 0:
             logger.info(f"   Processed {idx + 1}/{len(df)} products...")
     
-    # Create DataFrame
+    # Write rows straight out; every row shares the first row's columns
     logger.info("\n📊 Creating Shopify CSV...")
-    shopify_df = pd.DataFrame(shopify_rows)
-    
-    # Write to CSV
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    shopify_df.to_csv(output_path, index=False, encoding='utf-8', lineterminator='\n')
+    fieldnames = list(shopify_rows[0]) if shopify_rows else []
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(shopify_rows)
     
     # Stats
     elapsed = (datetime.now() - start_time).total_seconds()
@@ -25,6 +25,9 @@ from src.pipeline import ProductEnrichmentPipeline
 
 def setup_logging():
     """Configure logging"""
+    # No formatter shows thread/process fields; skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
     try:
         logging.config.dictConfig(LOGGING_CONFIG)
         print("✓ Logging configured")
@@ -6,7 +6,7 @@ import logging
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Dict, Tuple
 
 from src.models import ProductGroup, ProductData
 from config import CACHE_DIR
@@ -19,11 +19,22 @@ class CheckpointManager:
     Manage checkpoints for pipeline recovery.
     
     Saves progress after each batch to enable resuming if interrupted.
+    Checkpoints are appended to a single JSONL log (one line per batch),
+    so each save only writes the batch that was just processed plus the
+    stats counters that changed since the previous save. The log holds one
+    run: the first save of a run truncates whatever a previous run left.
     """
     
     def __init__(self):
         self.checkpoint_dir = Path(CACHE_DIR)
         self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_file = self.checkpoint_dir / 'checkpoint_log.jsonl'
+        
+        # Long-lived append handle, opened on first save; the first open of a
+        # run truncates the log so it doesn't grow across runs
+        self._handle = None
+        self._last_stats = {}
+        self._new_run = True
     
     def save_checkpoint(
         self, 
@@ -32,36 +43,84 @@ class CheckpointManager:
         stats: dict = None
     ):
         """
-        Save checkpoint after processing a batch.
+        Append checkpoint for a processed batch.
         
         Args:
             product_groups: List of processed ProductGroup objects
             batch_num: Current batch number
-            stats: Optional processing statistics
+            stats: Optional processing statistics (only changed values are written)
         """
+        if not product_groups:
+            logger.debug(f"Batch {batch_num} has no groups, skipping checkpoint")
+            return
+        
         try:
-            checkpoint_file = self.checkpoint_dir / f'checkpoint_batch_{batch_num}.json'
+            stats = stats or {}
+            stats_delta = {
+                key: value for key, value in stats.items()
+                if self._last_stats.get(key) != value
+            }
             
-            # Convert product groups to serializable format
             data = {
                 'batch_num': batch_num,
                 'timestamp': datetime.now().isoformat(),
                 'product_count': len(product_groups),
-                'stats': stats or {},
+                'stats': stats_delta,
                 'product_groups': [self._serialize_group(g) for g in product_groups]
             }
             
-            # Atomic write
-            temp_file = checkpoint_file.with_suffix('.tmp')
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            temp_file.replace(checkpoint_file)
+            if self._handle is None:
+                mode = 'w' if self._new_run else 'a'
+                self._handle = open(self.checkpoint_file, mode, encoding='utf-8')
+                self._new_run = False
+            
+            self._handle.write(json.dumps(data, ensure_ascii=False) + '\n')
+            self._handle.flush()
+            self._last_stats = dict(stats)
             
             logger.debug(f"Saved checkpoint for batch {batch_num} ({len(product_groups)} groups)")
             
         except Exception as e:
             logger.error(f"Failed to save checkpoint: {str(e)}")
     
+    def load_checkpoints(self) -> Tuple[Dict[int, List[ProductGroup]], dict]:
+        """
+        Replay the checkpoint log from a previous run.
+        
+        Returns:
+            Tuple of (product groups by batch number, accumulated stats)
+        """
+        batches = {}
+        stats = {}
+        
+        if not self.checkpoint_file.exists():
+            return batches, stats
+        
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partial last line from an interrupted write
+                        logger.warning("Skipping corrupt checkpoint line")
+                        continue
+                    
+                    batches[data['batch_num']] = [
+                        self._deserialize_group(g) for g in data.get('product_groups', [])
+                    ]
+                    stats.update(data.get('stats', {}))
+            
+            logger.info(f"Loaded checkpoints for {len(batches)} batches")
+            
+        except Exception as e:
+            logger.error(f"Failed to load checkpoints: {str(e)}")
+        
+        return batches, stats
+    
     def load_checkpoint(self, batch_num: int) -> Optional[List[ProductGroup]]:
         """
         Load checkpoint from previous run.
@@ -72,30 +131,30 @@ class CheckpointManager:
         Returns:
             List of ProductGroup objects, or None if not found
         """
-        try:
-            checkpoint_file = self.checkpoint_dir / f'checkpoint_batch_{batch_num}.json'
-            
-            if not checkpoint_file.exists():
-                return None
-            
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            product_groups = [
-                self._deserialize_group(g) for g in data.get('product_groups', [])
-            ]
-            
-            logger.info(f"Loaded checkpoint for batch {batch_num} ({len(product_groups)} groups)")
-            return product_groups
-            
-        except Exception as e:
-            logger.error(f"Failed to load checkpoint: {str(e)}")
-            return None
+        batches, _ = self.load_checkpoints()
+        return batches.get(batch_num)
+    
+    def start_run(self):
+        """Start a new run: its first checkpoint replaces the previous run's log"""
+        self.close()
+        self._last_stats = {}
+        self._new_run = True
+    
+    def close(self):
+        """Close the checkpoint log handle"""
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception as e:
+                logger.error(f"Failed to close checkpoint log: {str(e)}")
+            self._handle = None
     
     def clear_checkpoints(self):
         """Clear all checkpoint files"""
+        self.close()
+        self._last_stats = {}
         try:
-            for checkpoint_file in self.checkpoint_dir.glob('checkpoint_*.json'):
+            for checkpoint_file in self.checkpoint_dir.glob('checkpoint_*.json*'):
                 checkpoint_file.unlink()
             logger.info("Cleared all checkpoints")
         except Exception as e:
@@ -7,6 +7,7 @@ import json
 import re
 import hashlib
 import time
+import threading
 from typing import List, Dict, Optional, Any
 from pathlib import Path
 
@@ -58,6 +59,12 @@ class ClaudeEnricher:
         self.request_times = deque(maxlen=self.requests_per_minute)
         self.consecutive_rate_limits = 0
         
+        # Enrichment runs on a thread pool: serialize rate limiter bookkeeping
+        # (request times and the consecutive 429 counter) and cache file writes
+        # so workers don't race each other
+        self._rate_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        
         logger.info(f"ClaudeEnricher initialized with model: {self.model}")
         logger.info(f"Rate limiting: {self.requests_per_minute} req/min, adaptive={self.adaptive_delay}")
     
@@ -65,7 +72,15 @@ class ClaudeEnricher:
         """
         Smart rate limiting that adapts based on API responses.
         Prevents 429 errors while maximizing throughput.
+        
+        Thread-safe: concurrent workers queue up here, so request starts
+        stay spaced out even when enrichment runs in parallel.
         """
+        with self._rate_lock:
+            self._wait_for_rate_slot()
+    
+    def _wait_for_rate_slot(self):
+        """Sleep until the next request may start (caller holds _rate_lock)"""
         current_time = time.time()
         
         # Remove requests older than 60 seconds
@@ -97,15 +112,58 @@ class ClaudeEnricher:
         self.request_times.append(current_time)
     
     def _handle_rate_limit_success(self):
-        """Reset rate limit counter on successful request"""
-        if self.consecutive_rate_limits > 0:
-            logger.debug(f"Request successful, resetting rate limit counter")
-            self.consecutive_rate_limits = 0
+        """Reset rate limit counter on successful request (thread-safe)"""
+        with self._rate_lock:
+            if self.consecutive_rate_limits > 0:
+                logger.debug(f"Request successful, resetting rate limit counter")
+                self.consecutive_rate_limits = 0
     
     def _handle_rate_limit_error(self):
-        """Increment rate limit counter on 429 error"""
-        self.consecutive_rate_limits += 1
-        logger.warning(f"Rate limit hit (consecutive: {self.consecutive_rate_limits})")
+        """Increment rate limit counter on 429 error (thread-safe)"""
+        with self._rate_lock:
+            self.consecutive_rate_limits += 1
+            count = self.consecutive_rate_limits
+        logger.warning(f"Rate limit hit (consecutive: {count})")
+    
+    def _create_message(self, prompt: str, max_tokens: int, backoff_base: int = 2):
+        """
+        Send one prompt with adaptive rate limiting, retrying on 429 errors.
+        
+        Args:
+            prompt: User message content
+            max_tokens: Response token limit
+            backoff_base: Seconds before the first retry (doubled on each attempt)
+            
+        Returns:
+            Claude API message
+            
+        Raises:
+            RateLimitError: still rate limited after all attempts
+        """
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                # Apply adaptive rate limiting before request
+                self._adaptive_rate_limit()
+                
+                message = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    temperature=self.temperature,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+                
+                # Success - reset rate limit counter
+                self._handle_rate_limit_success()
+                return message
+            except RateLimitError:
+                self._handle_rate_limit_error()
+                if attempt < max_retries - 1:
+                    wait_time = (2 ** attempt) * backoff_base
+                    logger.warning(f"Rate limit hit, waiting {wait_time}s... (attempt {attempt + 1}/{max_retries})")
+                    time.sleep(wait_time)
+                else:
+                    raise
     
     def enrich_product_batch(self, brand: str, product_name: str, price: float, category: str = None) -> Dict[str, Any]:
         """
@@ -166,30 +224,8 @@ Return ONLY valid JSON in this exact format:
 }}"""
 
         try:
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    # Apply adaptive rate limiting before request
-                    self._adaptive_rate_limit()
-                    
-                    message = self.client.messages.create(
-                        model=self.model,
-                        max_tokens=2000,  # Larger for batched response
-                        temperature=self.temperature,
-                        messages=[{"role": "user", "content": prompt}]
-                    )
-                    
-                    # Success - reset rate limit counter
-                    self._handle_rate_limit_success()
-                    break
-                except RateLimitError:
-                    self._handle_rate_limit_error()
-                    if attempt < max_retries - 1:
-                        wait_time = (2 ** attempt) * 3
-                        logger.warning(f"Rate limit hit, waiting {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                    else:
-                        raise
+            # Larger token limit for the batched response
+            message = self._create_message(prompt, max_tokens=2000, backoff_base=3)
             
             response_text = message.content[0].text.strip()
             
@@ -274,34 +310,8 @@ If no variants are found in the name, return: []
 Important: Extract ONLY what exists in the product name. Do NOT invent variants."""
 
         try:
-            # Retry logic for rate limiting
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    # Apply adaptive rate limiting before request
-                    self._adaptive_rate_limit()
-                    
-                    message = self.client.messages.create(
-                        model=self.model,
-                        max_tokens=self.max_tokens['variants'],
-                        temperature=self.temperature,
-                        messages=[{
-                            "role": "user",
-                            "content": prompt
-                        }]
-                    )
-                    
-                    # Success - reset rate limit counter
-                    self._handle_rate_limit_success()
-                    break
-                except RateLimitError as e:
-                    self._handle_rate_limit_error()
-                    if attempt < max_retries - 1:
-                        wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
-                        logger.warning(f"Rate limit hit, waiting {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                    else:
-                        raise
+            # Exponential backoff on rate limits: 2s, 4s
+            message = self._create_message(prompt, max_tokens=self.max_tokens['variants'])
             
             response_text = message.content[0].text.strip()
             
@@ -325,6 +335,104 @@ Important: Extract ONLY what exists in the product name. Do NOT invent variants.
             logger.error(f"Variant extraction failed: {str(e)}")
             return []
     
+    def extract_variants_bulk(self, product_names: List[str]) -> List[List[Dict[str, str]]]:
+        """
+        Extract variant attributes for several product names in ONE Claude call.
+        
+        Same rules as extract_variants(), but all uncached names of a product
+        group share a single request instead of one round-trip per variant.
+        Results are cached per name under the same keys as extract_variants().
+        
+        Args:
+            product_names: Product names to analyze
+            
+        Returns:
+            List of variant lists, aligned with product_names
+        """
+        results = [self.cache.get(f"variants|{name}") for name in product_names]
+        pending = [
+            name for name, cached in zip(product_names, results) if cached is None
+        ]
+        # Unique names only, preserving order
+        pending = list(dict.fromkeys(pending))
+        
+        if len(pending) == 1:
+            extracted = {pending[0]: self.extract_variants(pending[0])}
+        elif pending:
+            extracted = self._extract_variants_for_names(pending)
+        else:
+            extracted = {}
+        
+        return [
+            cached if cached is not None else extracted.get(name, [])
+            for name, cached in zip(product_names, results)
+        ]
+    
+    def _extract_variants_for_names(self, product_names: List[str]) -> Dict[str, List[Dict[str, str]]]:
+        """Run one bulk variant extraction request; falls back to per-name calls on a malformed response"""
+        numbered = "\n".join(f"{idx}. {name}" for idx, name in enumerate(product_names, 1))
+        
+        prompt = f"""Extract ALL product variant attributes from each product name below ONLY.
+
+Product Names:
+{numbered}
+
+Find any of these variant types that exist in each name:
+- Color/Shade (e.g., Black, Blue, Red, Pink, Nude)
+- Size/Volume (e.g., 50ml, 100g, L, XL)
+- Flavor/Scent (e.g., Mint, Rose, Vanilla)
+- Type/Formula (e.g., Ammonia-Free, Organic, Matte)
+- Strength/Level (e.g., Light, Medium, Heavy)
+- Gender/Age (e.g., Men, Women, Unisex)
+- Finish (e.g., Glossy, Matte, Shimmer)
+
+Return ONLY a valid JSON array with exactly {len(product_names)} elements, one per product name in the same order.
+Each element is the variant array for that name. Example for 2 names:
+[[{{"name": "Color", "value": "Black"}}, {{"name": "Size", "value": "50ml"}}], []]
+
+Use [] for a name with no variants.
+
+Important: Extract ONLY what exists in each product name. Do NOT invent variants."""
+
+        try:
+            message = self._create_message(
+                prompt, max_tokens=min(self.max_tokens['variants'] * len(product_names), 4000)
+            )
+        except Exception as e:
+            # Rate limits exhausted / API error: per-name calls would only hit the
+            # same wall N more times, so fail like extract_variants() does
+            logger.error(f"Bulk variant extraction failed: {str(e)}")
+            return {name: [] for name in product_names}
+        
+        try:
+            response_text = message.content[0].text.strip()
+            parsed = self._parse_json_response(response_text, default=[])
+            
+            if not isinstance(parsed, list) or len(parsed) != len(product_names):
+                raise ValueError(f"expected {len(product_names)} results, got unusable response")
+            
+            extracted = {}
+            for name, variants in zip(product_names, parsed):
+                if not isinstance(variants, list):
+                    variants = []
+                variants = [
+                    v for v in variants
+                    if isinstance(v, dict) and 'name' in v and 'value' in v
+                    and isinstance(v['name'], str) and isinstance(v['value'], str)
+                ]
+                extracted[name] = variants
+                self.cache[f"variants|{name}"] = variants
+            
+            self._save_cache()
+            
+            logger.debug(f"Bulk extracted variants for {len(product_names)} names")
+            return extracted
+            
+        except Exception as e:
+            # Malformed or misaligned response: ask name by name instead
+            logger.warning(f"Bulk variant extraction failed, falling back to per-name: {str(e)}")
+            return {name: self.extract_variants(name) for name in product_names}
+    
     def generate_description(self, brand: str, product_name: str, price: float) -> str:
         """
         Generate professional product description.
@@ -1084,11 +1192,15 @@ Return ONLY the allergy/warning text, nothing else."""
     def _save_cache(self):
         """Save cache to file"""
         try:
-            # Atomic write using temp file
-            temp_file = self.cache_file.with_suffix('.tmp')
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
-            temp_file.replace(self.cache_file)
-            logger.debug(f"Saved {len(self.cache)} Claude responses to cache")
+            with self._cache_lock:
+                # Snapshot so other workers can keep adding entries while we dump
+                snapshot = dict(self.cache)
+                
+                # Atomic write using temp file
+                temp_file = self.cache_file.with_suffix('.tmp')
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, indent=2, ensure_ascii=False)
+                temp_file.replace(self.cache_file)
+            logger.debug(f"Saved {len(snapshot)} Claude responses to cache")
         except Exception as e:
             logger.error(f"Cache save failed: {e}")
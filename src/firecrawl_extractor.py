@@ -6,10 +6,11 @@ import logging
 import time
 import json
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
 from pathlib import Path
 
-from config import FIRECRAWL_API_KEY, API_CONFIG, CACHE_DIR
+from config import FIRECRAWL_API_KEY, API_CONFIG, CACHE_DIR, PROCESSING_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,7 @@ class FirecrawlExtractor:
     - Top 3 images selection
     - Caching
     - Rate limiting
+    - Pooled keep-alive connection to the Firecrawl API
     """
     
     def __init__(self, api_key: str = None):
@@ -37,6 +39,17 @@ class FirecrawlExtractor:
         self.max_retries = self.config['max_retries']
         self.rate_limit_delay = self.config['rate_limit_delay']
         
+        # One session for all scrapes: every request goes to the Firecrawl API host,
+        # so keep-alive lets parallel workers reuse connections instead of a new
+        # TCP + TLS handshake per product
+        pool_size = max(PROCESSING_CONFIG.get('max_workers', 1), 1)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+        
         # Cache setup
         self.cache_file = Path(CACHE_DIR) / 'firecrawl_cache.json'
         self.cache = self._load_cache()
@@ -68,11 +81,6 @@ class FirecrawlExtractor:
         logger.info(f"Extracting images from: {url}")
         
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
             # Updated payload for Firecrawl v1 API
             payload = {
                 "url": url,
@@ -82,10 +90,9 @@ class FirecrawlExtractor:
                 "waitFor": 2000  # Wait for images to load
             }
             
-            response = requests.post(
+            response = self.session.post(
                 self.endpoint,
                 json=payload,
-                headers=headers,
                 timeout=self.timeout
             )
             
@@ -186,6 +193,10 @@ class FirecrawlExtractor:
             logger.error(f"Image extraction failed: {str(e)}")
             return []
     
+    def close(self):
+        """Close pooled HTTP connections"""
+        self.session.close()
+    
     def _filter_images(self, images: List[Dict], product_name: str) -> List[str]:
         """
         Filter and score images by relevance, prioritizing main images over thumbnails.
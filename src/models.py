@@ -25,6 +25,7 @@ class ProductData:
     tax: str = ""
     vat_percentage: str = ""
     total_with_vat: float = 0.0
+    raw_images: List[str] = field(default_factory=list)  # Image URLs from the input CSV
     
     # Enriched fields (populated during processing)
     url: Optional[str] = None
@@ -238,11 +238,11 @@ class ProductParser:
             price=price,
             tax=tax,
             vat_percentage=vat,
-            total_with_vat=total_vat
+            total_with_vat=total_vat,
+            raw_images=images
         )
         
-        # Store images and category on the product object
-        product.raw_images = images
+        # Store category on the product object
         product.category = category if category else sub_category
         
         # Validate product
@@ -3,6 +3,8 @@ Pipeline Orchestrator
 Main processing pipeline that coordinates all modules.
 """
 import logging
+import queue
+import threading
 import time
 from datetime import datetime
 from typing import List, Tuple, Dict
@@ -21,6 +23,10 @@ from config import PROCESSING_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Output files are written through a 1 MiB buffer so row-by-row writes
+# turn into a few large write() syscalls
+OUTPUT_BUFFER_SIZE = 1 << 20
+
 
 class ProductEnrichmentPipeline:
     """
@@ -56,8 +62,25 @@ class ProductEnrichmentPipeline:
         self.max_workers = PROCESSING_CONFIG['max_workers']
         self.enable_checkpoints = PROCESSING_CONFIG['enable_checkpoints']
         
+        # Checkpoints are written by a background thread so batch N+1 doesn't
+        # wait on disk; the bounded queue applies back-pressure on a slow disk
+        self._ckpt_queue = queue.Queue(maxsize=4)
+        if self.enable_checkpoints:
+            threading.Thread(
+                target=self._checkpoint_writer, name="checkpoint-writer", daemon=True
+            ).start()
+        
         logger.info("Pipeline initialized")
     
+    def _checkpoint_writer(self):
+        """Background loop: persist queued (batch, batch_num, stats) checkpoints"""
+        while True:
+            product_groups, batch_num, stats = self._ckpt_queue.get()
+            try:
+                self.checkpoint_mgr.save_checkpoint(product_groups, batch_num, stats)
+            finally:
+                self._ckpt_queue.task_done()
+    
     def run(self, input_file: str, output_file: str, max_batches: int = None) -> Tuple[bool, ProcessingStats]:
         """
         Run the complete pipeline.
@@ -74,6 +97,10 @@ class ProductEnrichmentPipeline:
         stats.start_time = datetime.now().isoformat()
         start_time = time.time()
         
+        # Checkpoints of this run replace those of any earlier run
+        if self.enable_checkpoints:
+            self.checkpoint_mgr.start_run()
+        
         try:
             logger.info("\n" + "=" * 80)
             logger.info("PRODUCT ENRICHMENT PIPELINE START")
@@ -114,11 +141,14 @@ class ProductEnrichmentPipeline:
                 logger.info(f"Max batches limit: {max_batches}")
             
             all_output_files = []
+            total_batches = (len(product_groups) + self.batch_size - 1) // self.batch_size
+            
+            # One progress line per batch at INFO, thinned out to ~100 lines on huge runs
+            progress_every = max(1, total_batches // 100)
             
             for batch_idx in range(0, len(product_groups), self.batch_size):
                 batch = product_groups[batch_idx:batch_idx + self.batch_size]
                 batch_num = (batch_idx // self.batch_size) + 1
-                total_batches = (len(product_groups) + self.batch_size - 1) // self.batch_size
                 
                 # Check if we've reached the max batch limit
                 if max_batches and batch_num > max_batches:
@@ -126,27 +156,29 @@ class ProductEnrichmentPipeline:
                     logger.info(f"Processed {batch_num - 1} out of {total_batches} total batches")
                     break
                 
-                logger.info(f"\n{'='*60}")
-                logger.info(f"BATCH {batch_num}/{total_batches}")
-                logger.info(f"Processing groups {batch_idx + 1} to {min(batch_idx + self.batch_size, len(product_groups))}")
-                logger.info(f"{'='*60}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Batch {batch_num}/{total_batches}: groups {batch_idx + 1} to {batch_idx + len(batch)}")
                 
                 try:
                     self._process_batch(batch, stats)
                     
-                    # Save checkpoint
+                    # Queue checkpoint (written in the background)
                     if self.enable_checkpoints:
-                        self.checkpoint_mgr.save_checkpoint(batch, batch_num, stats.to_dict())
+                        self._ckpt_queue.put((list(batch), batch_num, stats.to_dict()))
                     
                     # Generate output CSV for this batch immediately
-                    logger.info(f"\n→ Generating CSV for batch {batch_num}...")
                     batch_output_files = self._generate_batch_output(
                         batch, output_file, batch_num, total_batches, stats
                     )
                     
                     if batch_output_files:
                         all_output_files.extend(batch_output_files)
-                        logger.info(f"✓ Generated {len(batch_output_files)} file(s) for batch {batch_num}")
+                        if batch_num % progress_every == 0 or batch_num == total_batches:
+                            logger.info(
+                                f"✓ Batch {batch_num}/{total_batches} "
+                                f"({batch_idx + len(batch)}/{len(product_groups)} groups, "
+                                f"{len(batch_output_files)} file(s))"
+                            )
                     else:
                         logger.warning(f"No output files generated for batch {batch_num}")
                         
@@ -180,6 +212,14 @@ class ProductEnrichmentPipeline:
             stats.end_time = datetime.now().isoformat()
             stats.processing_time_sec = time.time() - start_time
             return False, stats
+        
+        finally:
+            # Wait for queued checkpoints before closing the log
+            if self.enable_checkpoints:
+                self._ckpt_queue.join()
+            self.checkpoint_mgr.close()
+            self.searcher.close()
+            self.extractor.close()
     
     def _enrich_single_group(self, group: ProductGroup) -> bool:
         """
@@ -215,11 +255,15 @@ class ProductEnrichmentPipeline:
             group.suggested_usage = enriched["suggested_usage"]
             group.allergy_info = enriched["allergy_info"]
             
-            # Extract variants from each product in group (separate call, needed per variant)
-            for variant in group.variants:
-                variant.variants = self.enricher.extract_variants(variant.name)
+            # Extract variants for all products in group (one call for the whole group)
+            variant_options = self.enricher.extract_variants_bulk(
+                [variant.name for variant in group.variants]
+            )
+            for variant, options in zip(group.variants, variant_options):
+                variant.variants = options
             
-            logger.debug(f"  ✓ {group.base_name} (enriched with benefits)")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"  ✓ {group.base_name} (enriched with benefits)")
             return True
             
         except Exception as e:
@@ -236,14 +280,13 @@ class ProductEnrichmentPipeline:
             stats: Statistics object to update
         """
         # SKIP Phase 1 & 2: URLs and images already in input CSV
-        logger.info("\n→ Skipping URL/Image fetching (using images from input CSV)")
+        logger.debug("Skipping URL/Image fetching (using images from input CSV)")
         
         # Collect images from variants in each group
         for group in batch:
             all_images = []
             for variant in group.variants:
-                if hasattr(variant, 'raw_images') and variant.raw_images:
-                    all_images.extend(variant.raw_images)
+                all_images.extend(variant.raw_images)
             # Remove duplicates while preserving order
             seen = set()
             group.images = [img for img in all_images if img and img not in seen and not seen.add(img)]
@@ -251,7 +294,7 @@ class ProductEnrichmentPipeline:
                 stats.total_images += len(group.images)
         
         # Phase 3: Enrich with Claude (parallel for speed)
-        logger.info("\n→ Enriching with Claude AI (parallel)...")
+        logger.debug("Enriching with Claude AI")
         
         if PROCESSING_CONFIG.get('parallel_enrichment', False):
             # Parallel enrichment using ThreadPoolExecutor
@@ -317,19 +360,23 @@ class ProductEnrichmentPipeline:
             else:
                 batch_output_file = output_dir / f"{output_base}_batch{batch_num:03d}{output_ext}"
             
-            # Generate CSV for this batch
-            csv_content = self.csv_gen.generate_shopify_csv(batch)
-            
-            if not csv_content:
+            # Stream this batch's CSV into a temp file, renamed into place only
+            # once generation succeeds (no partial CSV left behind on failure)
+            temp_file = batch_output_file.with_name(batch_output_file.name + '.tmp')
+            try:
+                with open(temp_file, 'w', encoding='utf-8', newline='', buffering=OUTPUT_BUFFER_SIZE) as f:
+                    self.csv_gen.generate_shopify_csv(batch, out=f)
+            except Exception:
+                temp_file.unlink(missing_ok=True)
+                raise
+            row_count = self.csv_gen.last_row_count
+            
+            if not row_count:
+                temp_file.unlink(missing_ok=True)
                 logger.error(f"Failed to generate CSV for batch {batch_num}")
                 return []
             
-            # Parse and count rows
-            import csv
-            from io import StringIO
-            reader = csv.DictReader(StringIO(csv_content))
-            rows = list(reader)
-            row_count = len(rows)
+            temp_file.replace(batch_output_file)
             
             # Now split this batch's output into files based on records_per_file
             from config import PROCESSING_CONFIG
@@ -337,10 +384,6 @@ class ProductEnrichmentPipeline:
             
             # If batch rows fit in one file or no splitting needed
             if row_count <= records_per_file:
-                # Write single file
-                with open(batch_output_file, 'w', encoding='utf-8', newline='') as f:
-                    f.write(csv_content)
-                
                 logger.debug(f"  Wrote {row_count} rows to {batch_output_file.name}")
                 stats.csv_rows_generated += row_count
                 stats.output_files_generated += 1
@@ -348,9 +391,16 @@ class ProductEnrichmentPipeline:
                 return [str(batch_output_file)]
             
             else:
-                # Split into multiple files
+                # Split into multiple files (rare: batches are normally far
+                # below records_per_file), reading the combined file back
+                import csv
+                with open(batch_output_file, 'r', encoding='utf-8', newline='') as f:
+                    reader = csv.reader(f)
+                    header = next(reader)
+                    rows = list(reader)
+                batch_output_file.unlink()
+                
                 output_files = []
-                header = reader.fieldnames
                 num_files = (row_count + records_per_file - 1) // records_per_file
                 
                 for file_idx in range(num_files):
@@ -365,9 +415,9 @@ class ProductEnrichmentPipeline:
                         file_path = output_dir / f"{output_base}_batch{batch_num:03d}_part{file_idx + 1:03d}{output_ext}"
                     
                     # Write file
-                    with open(file_path, 'w', encoding='utf-8', newline='') as f:
-                        writer = csv.DictWriter(f, fieldnames=header)
-                        writer.writeheader()
+                    with open(file_path, 'w', encoding='utf-8', newline='', buffering=OUTPUT_BUFFER_SIZE) as f:
+                        writer = csv.writer(f)
+                        writer.writerow(header)
                         writer.writerows(file_rows)
                     
                     logger.debug(f"  Wrote {len(file_rows)} rows to {file_path.name}")
@@ -449,7 +499,7 @@ class ProductEnrichmentPipeline:
                 file_path = output_dir / f"{output_base}_part{file_idx + 1:03d}{output_ext}"
             
             # Write batch to file
-            with open(file_path, 'w', encoding='utf-8', newline='') as f:
+            with open(file_path, 'w', encoding='utf-8', newline='', buffering=OUTPUT_BUFFER_SIZE) as f:
                 writer = csv.DictWriter(f, fieldnames=header)
                 writer.writeheader()
                 writer.writerows(batch_rows)
@@ -463,46 +513,53 @@ class ProductEnrichmentPipeline:
         
         # Validate first file
         logger.info("\n--- VALIDATING OUTPUT ---")
-        with open(output_files[0], 'r', encoding='utf-8') as f:
-            first_file_content = f.read()
+        first_file_rows = min(records_per_file, total_rows)
         
-        if not self._validate_output(first_file_content):
+        if not self._validate_output(output_files[0], first_file_rows):
             logger.error("Output validation failed")
             stats.add_error("Output validation failed")
             return []
         
         return output_files
     
-    def _validate_output(self, csv_content: str) -> bool:
+    def _validate_output(self, csv_path: str, row_count: int = None) -> bool:
         """
-        Validate final CSV before writing.
+        Validate a written CSV file.
+        
+        Only the header and the first rows are read (streamed from disk),
+        so cost does not grow with the size of the output.
         
         Checks:
         - Valid CSV format
         - Has header and data rows
         - Required columns present
         - Sample row validation
+        
+        Args:
+            csv_path: Path to the CSV file to validate
+            row_count: Number of data rows written (known from generation, for logging)
         """
         try:
-            lines = csv_content.split('\n')
-            
-            if len(lines) < 2:
-                logger.error("CSV is empty")
-                return False
-            
-            # Parse header
             import csv
-            from io import StringIO
-            reader = csv.DictReader(StringIO(csv_content))
-            rows = list(reader)
+            from itertools import islice
             
-            if not rows:
+            with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.DictReader(f)
+                header = reader.fieldnames
+                
+                if not header:
+                    logger.error("CSV is empty")
+                    return False
+                
+                # Spot check only the first rows
+                sample = list(islice(reader, 10))
+            
+            if not sample:
                 logger.error("CSV has no data rows")
                 return False
             
             # Check required columns
             required_cols = ['Handle', 'Title', 'Vendor', 'Variant Price']
-            header = reader.fieldnames or []
             
             for col in required_cols:
                 if col not in header:
@@ -511,7 +568,7 @@ class ProductEnrichmentPipeline:
             
             # Spot check rows
             valid_rows = 0
-            for row in rows[:min(10, len(rows))]:
+            for row in sample:
                 if row.get('Handle') and row.get('Title') and row.get('Vendor'):
                     valid_rows += 1
             
@@ -519,7 +576,10 @@ class ProductEnrichmentPipeline:
                 logger.error("No valid rows in sample")
                 return False
             
-            logger.info(f"✓ CSV validation passed ({len(rows)} rows)")
+            if row_count is not None:
+                logger.info(f"✓ CSV validation passed ({row_count} rows)")
+            else:
+                logger.info("✓ CSV validation passed")
             return True
             
         except Exception as e:
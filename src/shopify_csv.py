@@ -4,16 +4,38 @@ Generate Shopify-compliant CSV from enriched product data.
 """
 import logging
 import csv
+import functools
 import re
+import string
 import unicodedata
-import pandas as pd
-from typing import List, Dict, Set, Optional
+from collections import Counter
+from typing import List, Dict, Set, Optional, TextIO, Union
 from io import StringIO
+from pathlib import Path
 
 from src.models import ProductGroup, ProductData
 
 logger = logging.getLogger(__name__)
 
+# Handle sanitization patterns (compiled once, used for every product group)
+# ASCII whitespace becomes '-', [a-z0-9-] is kept, everything else is dropped
+_HANDLE_TRANSLATION = str.maketrans({
+    chr(cp): '-' if chr(cp).isspace() else (
+        chr(cp) if chr(cp) in string.ascii_lowercase + string.digits + '-' else None
+    )
+    for cp in range(128)
+})
+_RE_DASHES = re.compile(r'-{2,}')
+# Already a valid handle: lowercase alphanumeric words joined by single hyphens
+_RE_CLEAN_HANDLE = re.compile(r'[a-z0-9]+(?:-[a-z0-9]+)*')
+
+# (name, value) column pairs for the three Shopify option slots
+_OPTION_KEYS = (
+    ('Option1 Name', 'Option1 Value'),
+    ('Option2 Name', 'Option2 Value'),
+    ('Option3 Name', 'Option3 Value'),
+)
+
 
 class ShopifyCSVGenerator:
     """
@@ -27,8 +49,11 @@ class ShopifyCSVGenerator:
     - All required Shopify fields
     """
     
+    # Rows buffered per writerows() call when writing the CSV
+    WRITE_CHUNK_ROWS = 1000
+    
     # Shopify CSV column order (must match template exactly)
-    SHOPIFY_COLUMNS = [
+    SHOPIFY_COLUMNS = (
         'Handle', 'Title', 'Body (HTML)', 'Vendor', 'Product Category',
         'Type', 'Tags', 'Published', 
         'Option1 Name', 'Option1 Value', 'Option1 Linked To',
@@ -54,44 +79,127 @@ class ShopifyCSVGenerator:
         'Suggested Usage (product.metafields.custom.suggested_use)',
         'Variant Image', 'Variant Weight Unit', 'Variant Tax Code',
         'Cost per item', 'Status'
-    ]
+    )
+    
+    # Column name -> position; rows are plain lists written by csv.writer
+    _COL_INDEX = {col: idx for idx, col in enumerate(SHOPIFY_COLUMNS)}
+    
+    # Fixed positions of the per-variant fields (column layout is static)
+    _IDX_SKU = _COL_INDEX['Variant SKU']
+    _IDX_INVENTORY_TRACKER = _COL_INDEX['Variant Inventory Tracker']
+    _IDX_INVENTORY_POLICY = _COL_INDEX['Variant Inventory Policy']
+    _IDX_FULFILLMENT = _COL_INDEX['Variant Fulfillment Service']
+    _IDX_PRICE = _COL_INDEX['Variant Price']
+    _IDX_REQUIRES_SHIPPING = _COL_INDEX['Variant Requires Shipping']
+    _IDX_TAXABLE = _COL_INDEX['Variant Taxable']
+    _IDX_BARCODE = _COL_INDEX['Variant Barcode']
+    _IDX_IMAGE_SRC = _COL_INDEX['Image Src']
+    _IDX_IMAGE_POSITION = _COL_INDEX['Image Position']
+    _IDX_IMAGE_ALT = _COL_INDEX['Image Alt Text']
+    _IDX_GIFT_CARD = _COL_INDEX['Gift Card']
+    _IDX_OPTIONS = (
+        (_COL_INDEX['Option1 Name'], _COL_INDEX['Option1 Value']),
+        (_COL_INDEX['Option2 Name'], _COL_INDEX['Option2 Value']),
+        (_COL_INDEX['Option3 Name'], _COL_INDEX['Option3 Value']),
+    )
+    
+    # Rows start from this and only set what they need: every column empty
+    # except the values that are identical on every row
+    _ROW_TEMPLATE = [''] * len(SHOPIFY_COLUMNS)
+    _ROW_TEMPLATE[_IDX_REQUIRES_SHIPPING] = 'TRUE'
+    _ROW_TEMPLATE[_IDX_TAXABLE] = 'TRUE'
+    _ROW_TEMPLATE[_IDX_GIFT_CARD] = 'FALSE'
     
     def __init__(self):
         self.seen_handles = set()
+        # Last counter suffix used per base handle, so repeated collisions
+        # on the same base don't rescan -1, -2, ... from the start
+        self._collision_count: Dict[str, int] = {}
+        # Sanitized brand / base-name words; brands repeat across most of a catalog
+        self._sanitize_cache: Dict[str, str] = {}
+        # Data rows written by the last generate_shopify_csv() call
+        self.last_row_count = 0
     
-    def generate_shopify_csv(self, product_groups: List[ProductGroup]) -> str:
+    def generate_shopify_csv(
+        self,
+        product_groups: List[ProductGroup],
+        out: Optional[Union[str, Path, TextIO]] = None
+    ) -> Optional[str]:
         """
         Generate Shopify CSV from product groups.
         
         Args:
             product_groups: List of ProductGroup objects
+            out: Optional destination (file path or writable text stream). When
+                given, rows are written there directly instead of being built
+                into a string; check last_row_count for the result
             
         Returns:
-            CSV string ready to write to file
+            CSV string ready to write to file ("" if nothing was generated),
+            or None when written to `out`
         """
-        logger.info("\n" + "=" * 80)
-        logger.info("GENERATING SHOPIFY CSV")
-        logger.info("=" * 80)
+        self.last_row_count = 0
         
         if not product_groups:
             logger.warning("No product groups to generate CSV")
-            return ""
+            return "" if out is None else None
+        
+        if out is None:
+            buffer = StringIO()
+            row_count = self._write_csv(product_groups, buffer)
+            return buffer.getvalue() if row_count else ""
+        
+        if isinstance(out, (str, Path)):
+            with open(out, 'w', encoding='utf-8', newline='') as f:
+                row_count = self._write_csv(product_groups, f)
+            if not row_count:
+                # Don't leave an empty file behind
+                Path(out).unlink(missing_ok=True)
+        else:
+            self._write_csv(product_groups, out)
         
-        rows = []
+        return None
+    
+    def _write_csv(self, product_groups: List[ProductGroup], stream: TextIO) -> int:
+        """
+        Resolve handles and write every product group's rows to a text stream.
+        
+        The header is only written once the first group produced rows, so
+        nothing at all is written if every group fails.
+        
+        Returns:
+            Number of data rows written
+        """
+        row_count = 0
         self.seen_handles = set()
+        self._collision_count = {}
         
-        for idx, group in enumerate(product_groups, 1):
+        # Pass 1: resolve every handle up front (sanitize all, then dedupe in input order)
+        handles = self._generate_unique_handles(product_groups)
+        
+        # Rows are already in SHOPIFY_COLUMNS order, so write them positionally
+        writer = csv.writer(stream, lineterminator='\n', quoting=csv.QUOTE_MINIMAL)
+        
+        # Pass 2: generate rows; handles are fixed, so this no longer touches seen_handles.
+        # Rows are handed to the writer in chunks rather than as one catalog-wide list
+        pending = []
+        for idx, (group, handle) in enumerate(zip(product_groups, handles), 1):
+            if not handle:
+                logger.warning(f"Failed to generate handle for: {group.base_name}")
+                continue
+            
             try:
-                # Generate unique handle for this product group
-                handle = self._generate_unique_handle(group)
-                
-                if not handle:
-                    logger.warning(f"Failed to generate handle for: {group.base_name}")
-                    continue
-                
-                # Generate rows for this product group
+                # Generate rows for this product group (built in full first, so a
+                # failing group never leaves partial rows in the output)
                 product_rows = self._generate_product_rows(group, handle)
-                rows.extend(product_rows)
+                if product_rows and not row_count:
+                    writer.writerow(self.SHOPIFY_COLUMNS)
+                pending.extend(product_rows)
+                row_count += len(product_rows)
+                
+                if len(pending) >= self.WRITE_CHUNK_ROWS:
+                    writer.writerows(pending)
+                    pending.clear()
                 
                 if idx % 50 == 0:
                     logger.debug(f"Generated CSV rows for {idx} products...")
@@ -100,37 +208,59 @@ class ShopifyCSVGenerator:
                 logger.error(f"Failed to generate rows for {group.base_name}: {str(e)}")
                 continue
         
-        if not rows:
-            logger.error("No valid CSV rows generated")
-            return ""
-        
-        # Create DataFrame
-        df = pd.DataFrame(rows)
-        
-        # Ensure correct column order
-        for col in self.SHOPIFY_COLUMNS:
-            if col not in df.columns:
-                df[col] = ''
+        writer.writerows(pending)
+        self.last_row_count = row_count
         
-        df = df[self.SHOPIFY_COLUMNS]
+        if not row_count:
+            logger.error("No valid CSV rows generated")
+            return 0
         
-        # Convert to CSV string
-        csv_string = df.to_csv(
-            index=False,
-            encoding='utf-8',
-            lineterminator='\n',
-            quoting=csv.QUOTE_MINIMAL
+        logger.debug(
+            f"CSV generation complete: {len(product_groups)} product groups, "
+            f"{row_count} rows, {len(self.seen_handles)} unique handles"
         )
         
-        csv_rows = len(rows)
-        logger.info(f"\n✓ CSV generation complete:")
-        logger.info(f"  Product groups:  {len(product_groups)}")
-        logger.info(f"  CSV rows:        {csv_rows}")
-        logger.info(f"  Unique handles:  {len(self.seen_handles)}")
+        return row_count
+    
+    def _generate_unique_handles(self, product_groups: List[ProductGroup]) -> List[Optional[str]]:
+        """
+        Resolve unique handles for all product groups in one pass.
         
-        return csv_string
+        Returns:
+            Handles aligned with product_groups (None where generation failed)
+        """
+        # A group whose handle can't be built is dropped on its own (None),
+        # not the whole batch
+        base_handles = []
+        for group in product_groups:
+            try:
+                base_handles.append(self._base_handle(group))
+            except Exception as e:
+                logger.error(f"Failed to generate handle for {group.base_name}: {str(e)}")
+                base_handles.append(None)
+        
+        # Common case: no two bases collide, so no suffixes are needed and the
+        # whole batch can be registered with one set build
+        if not self.seen_handles and None not in base_handles:
+            unique_bases = set(base_handles)
+            if len(unique_bases) == len(base_handles):
+                self.seen_handles = unique_bases
+                return base_handles
+        
+        handles = []
+        for group, base_handle in zip(product_groups, base_handles):
+            if base_handle is None:
+                handles.append(None)
+                continue
+            try:
+                handles.append(self._generate_unique_handle(group, base_handle))
+            except Exception as e:
+                logger.error(f"Failed to generate handle for {group.base_name}: {str(e)}")
+                handles.append(None)
+        
+        return handles
     
-    def _generate_unique_handle(self, group: ProductGroup) -> str:
+    def _generate_unique_handle(self, group: ProductGroup, base_handle: Optional[str] = None) -> str:
         """
         Generate unique Shopify-compliant handle.
         
@@ -139,8 +269,13 @@ class ShopifyCSVGenerator:
         - Lowercase letters, numbers, hyphens only
         - No leading/trailing hyphens
         - Must be unique
+        
+        Args:
+            group: Product group to generate the handle for
+            base_handle: Already sanitized base handle (computed from the group if omitted)
         """
-        base_handle = self._sanitize_handle(f"{group.brand}-{group.base_name}")
+        if base_handle is None:
+            base_handle = self._base_handle(group)
         
         # If unique, return as-is
         if base_handle not in self.seen_handles:
@@ -162,51 +297,76 @@ class ShopifyCSVGenerator:
                 self.seen_handles.add(handle_final)
                 return handle_final
         
-        # Very last resort: add counter
-        counter = 1
-        while f"{base_handle}-{counter}" in self.seen_handles:
+        # Very last resort: add counter (resume from last suffix used for this base)
+        counter = self._collision_count.get(base_handle, 0) + 1
+        final_handle = f"{base_handle}-{counter}"
+        while final_handle in self.seen_handles:
             counter += 1
+            final_handle = f"{base_handle}-{counter}"
         
-        final_handle = f"{base_handle}-{counter}"
+        self._collision_count[base_handle] = counter
         self.seen_handles.add(final_handle)
         return final_handle
     
-    def _sanitize_handle(self, text: str) -> str:
+    def _base_handle(self, group: ProductGroup) -> str:
+        """
+        Sanitized "{brand}-{base_name}" handle for a group.
+        
+        Brand and base name are sanitized (and cached) separately; joining the
+        non-empty parts with a hyphen gives the same result as sanitizing the
+        combined string, since no character is affected by its neighbours.
+        Both are coerced with str() like the f-string they replace, so a
+        missing (None) or numeric name from enrichment still yields a handle.
+        """
+        parts = (self._sanitize_words(str(group.brand)), self._sanitize_words(str(group.base_name)))
+        handle = '-'.join(part for part in parts if part)[:255]
+        return handle if handle else 'product'
+    
+    def _sanitize_words(self, text: str) -> str:
         """
-        Convert text to Shopify-compliant handle.
+        Lowercase, strip accents/punctuation and hyphenate text (memoized).
         
         Examples:
         "Beauty™ System® MW-Capsules" → "beauty-system-mw-capsules"
         "Product (Old)" → "product-old"
         "Café Crème" → "cafe-creme"
+        
+        Returns:
+            Hyphen-joined words without length limit; empty if nothing survives
         """
+        cached = self._sanitize_cache.get(text)
+        if cached is not None:
+            return cached
+        
+        sanitized = self._sanitize_uncached(text)
+        self._sanitize_cache[text] = sanitized
+        return sanitized
+    
+    def _sanitize_uncached(self, text: str) -> str:
+        """Sanitization body behind _sanitize_words"""
         # Convert to lowercase
         text = text.lower()
         
-        # Remove accents
-        text = ''.join(
-            c for c in unicodedata.normalize('NFD', text)
-            if unicodedata.category(c) != 'Mn'
-        )
-        
-        # Remove non-alphanumeric except hyphens and spaces
-        text = re.sub(r'[^a-z0-9\s\-]', '', text)
-        
-        # Replace spaces with hyphens
-        text = re.sub(r'\s+', '-', text)
-        
-        # Collapse multiple hyphens
-        text = re.sub(r'-+', '-', text)
-        
-        # Remove leading/trailing hyphens
-        text = text.strip('-')
+        if text.isascii():
+            # Nothing to strip, replace or collapse
+            if _RE_CLEAN_HANDLE.fullmatch(text):
+                return text
+        else:
+            # Fold any Unicode whitespace (e.g. NBSP) to plain spaces so it still
+            # becomes a hyphen after the ASCII filter below
+            text = ' '.join(text.split())
+            
+            # Remove accents: NFD splits "é" into "e" + combining mark, and the
+            # ASCII encode drops the mark (and any other non-ASCII) in C
+            text = unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('ascii')
         
-        # Ensure not too long
-        text = text[:255]
+        # Spaces to hyphens and drop everything else non-alphanumeric, in one C pass
+        text = text.translate(_HANDLE_TRANSLATION)
         
-        return text if text else 'product'
+        # Collapse multiple hyphens, then remove leading/trailing ones
+        return _RE_DASHES.sub('-', text).strip('-')
     
-    def _generate_product_rows(self, group: ProductGroup, handle: str) -> List[Dict]:
+    def _generate_product_rows(self, group: ProductGroup, handle: str) -> List[List]:
         """
         Generate CSV rows for a product group.
         
@@ -220,21 +380,26 @@ class ShopifyCSVGenerator:
         """
         rows = []
         
-        if not group.variants:
+        # Bind group attributes once; they're read for every variant/image row
+        variants = group.variants
+        brand = group.brand
+        category = group.category
+        
+        if not variants:
             logger.warning(f"No variants for group: {group.base_name}")
             return rows
         
         # Shared data for ALL variants (same handle, no repeated title)
         # Extract subcategory (part after ">") for Type field
         subcategory = ''
-        if group.category and '>' in group.category:
-            subcategory = group.category.split('>')[-1].strip()
-        elif group.category:
-            subcategory = group.category
+        if category and '>' in category:
+            subcategory = category.split('>')[-1].strip()
+        elif category:
+            subcategory = category
         
         shared_data = {
             'Handle': handle,
-            'Vendor': group.brand,
+            'Vendor': brand,
             'Product Category': '',  # Keep empty as requested
             'Type': subcategory,  # Only the part after ">", e.g., "Oral Care"
             'Tags': ','.join(group.tags) if group.tags else '',
@@ -242,80 +407,79 @@ class ShopifyCSVGenerator:
             'Status': 'active',
         }
         
+        # First row includes product title, description and benefit metafields
+        first_variant_data = shared_data | {
+            'Title': group.base_name,
+            'Body (HTML)': group.description or '',
+            'Allergy Information (product.metafields.custom.allergy_information)': getattr(group, 'allergy_info', ''),
+            'Benefits (product.metafields.custom.benefits)': getattr(group, 'benefits', ''),
+            'Custom Ingredients (product.metafields.custom.custom_ingredients)': getattr(group, 'ingredients', ''),
+            'Good For (product.metafields.custom.good_for)': getattr(group, 'good_for', ''),
+            'Suggested Usage (product.metafields.custom.suggested_use)': getattr(group, 'suggested_usage', ''),
+        }
+        
+        # Subsequent rows: Keep Vendor and Type consistent across all variants,
+        # everything else (Title, Tags, Published, metafields...) stays empty
+        other_variant_data = {
+            'Handle': handle,
+            'Vendor': brand,
+            'Type': subcategory,
+        }
+        
+        # Lay both out positionally once; each row then starts from a list copy
+        first_variant_row = self._build_base_row(first_variant_data)
+        other_variant_row = self._build_base_row(other_variant_data)
+        
         # CRITICAL FIX: Extract Option Names from variant with MOST options
         # All variants MUST use the same Option Names (Shopify Rule 1)
         # We need to find the variant with the most complete option set
-        standard_option_names = self._extract_standard_option_names_from_all(group.variants)
+        standard_option_names = self._extract_standard_option_names_from_all(variants)
         
         # Track image position across all variants
         image_position = 1
         
         # Process each variant
-        for variant_idx, variant in enumerate(group.variants):
+        for variant_idx, variant in enumerate(variants):
             # Extract variant VALUES using the STANDARD option names
             variant_options = self._extract_variant_options(variant, standard_option_names)
             
             # Get images for THIS specific variant (from input CSV)
-            variant_images = variant.raw_images if hasattr(variant, 'raw_images') and variant.raw_images else []
+            variant_images = variant.raw_images
             
-            # First variant gets the product info
-            is_first_variant = (variant_idx == 0)
+            # First variant gets the product info; options and price are the same
+            # on every row of this variant, so lay them out once
+            variant_row = self._create_variant_row(
+                first_variant_row if variant_idx == 0 else other_variant_row,
+                variant,
+                variant_options
+            )
             
-            if is_first_variant:
-                # First row includes product title and description
-                row_data = shared_data.copy()
-                row_data['Title'] = group.base_name
-                row_data['Body (HTML)'] = group.description or ''
-                
-                # Add benefit metafields
-                row_data['Allergy Information (product.metafields.custom.allergy_information)'] = getattr(group, 'allergy_info', '')
-                row_data['Benefits (product.metafields.custom.benefits)'] = getattr(group, 'benefits', '')
-                row_data['Custom Ingredients (product.metafields.custom.custom_ingredients)'] = getattr(group, 'ingredients', '')
-                row_data['Good For (product.metafields.custom.good_for)'] = getattr(group, 'good_for', '')
-                row_data['Suggested Usage (product.metafields.custom.suggested_use)'] = getattr(group, 'suggested_usage', '')
-            else:
-                # Subsequent rows: Keep Product Category and Type consistent across all variants
-                row_data = {
-                    'Handle': handle,
-                    'Title': '',  # Empty for subsequent variants
-                    'Body (HTML)': '',
-                    'Vendor': group.brand,  # Keep vendor for all variants
-                    'Product Category': '',  # Keep empty
-                    'Type': subcategory,  # Keep type consistent with first variant
-                    'Tags': '',
-                    'Published': '',
-                    'Status': '',
-                    'Allergy Information (product.metafields.custom.allergy_information)': '',
-                    'Benefits (product.metafields.custom.benefits)': '',
-                    'Custom Ingredients (product.metafields.custom.custom_ingredients)': '',
-                    'Good For (product.metafields.custom.good_for)': '',
-                    'Suggested Usage (product.metafields.custom.suggested_use)': '',
-                }
+            # SKU and inventory (only on first row per variant)
+            first_row = variant_row.copy()
+            upc_code = variant.upc_code
+            first_row[self._IDX_SKU] = upc_code
+            first_row[self._IDX_INVENTORY_TRACKER] = 'shopify'
+            first_row[self._IDX_INVENTORY_POLICY] = 'continue'
+            first_row[self._IDX_FULFILLMENT] = 'manual'
+            first_row[self._IDX_BARCODE] = upc_code
             
             # If this variant has images, create one row per image
             if variant_images:
+                # Same alt text on every image row of this variant
+                image_alt = f"{variant.brand} {variant.name}"
+                
                 for img_idx, image_url in enumerate(variant_images):
-                    row = self._create_variant_row(
-                        row_data,
-                        variant,
-                        variant_options,
-                        image_url,
-                        image_position,
-                        is_first=(img_idx == 0)  # Only first image row of this variant gets full data
-                    )
+                    # Only first image row of this variant gets full data
+                    row = first_row if img_idx == 0 else variant_row.copy()
+                    if image_url:
+                        row[self._IDX_IMAGE_SRC] = image_url
+                        row[self._IDX_IMAGE_ALT] = image_alt
+                    row[self._IDX_IMAGE_POSITION] = image_position
                     rows.append(row)
                     image_position += 1
             else:
                 # No images for this variant - create single row
-                row = self._create_variant_row(
-                    row_data,
-                    variant,
-                    variant_options,
-                    None,
-                    None,
-                    is_first=True
-                )
-                rows.append(row)
+                rows.append(first_row)
         
         return rows
     
@@ -334,31 +498,38 @@ class ShopifyCSVGenerator:
         Returns:
             Dict with standardized option names: {'Option1 Name': 'Color', 'Option2 Name': 'Size', ...}
         """
-        # Count how many variants have each normalized option type
-        option_counts = {}
+        # Only include options that appear in at least 30% of variants
+        # OR if there are only 1-3 variants, include all options
+        threshold = max(1, len(variants) * 0.3)
+        
+        # Small groups: any option seen once qualifies, so a union is enough;
+        # otherwise count how many variants have each normalized option type
+        all_options = set()
+        option_counts = Counter()
+        normalize = self._normalize_option_name
         
         for variant in variants:
             seen_in_variant = set()  # Track which options this variant has
-            if hasattr(variant, 'variants') and variant.variants:
+            if variant.variants:
                 for var in variant.variants:
                     option_name = var.get('name', '').strip()
                     if option_name:
                         # Normalize the option name to a standard type
-                        normalized = self._normalize_option_name(option_name)
-                        seen_in_variant.add(normalized)
+                        seen_in_variant.add(normalize(option_name))
             
-            # Count each unique option in this variant
-            for opt in seen_in_variant:
-                option_counts[opt] = option_counts.get(opt, 0) + 1
-        
-        # Only include options that appear in at least 30% of variants
-        # OR if there are only 1-2 variants, include all options
-        threshold = max(1, len(variants) * 0.3)
+            if threshold == 1:
+                all_options |= seen_in_variant
+            else:
+                # Count each unique option in this variant
+                option_counts.update(seen_in_variant)
         
-        standard_option_types = [
-            opt for opt, count in sorted(option_counts.items())
-            if count >= threshold
-        ][:3]  # Max 3 options
+        if threshold == 1:
+            standard_option_types = sorted(all_options)[:3]  # Max 3 options
+        else:
+            standard_option_types = sorted(
+                opt for opt, count in option_counts.items()
+                if count >= threshold
+            )[:3]  # Max 3 options
         
         # Create standard names dict
         standard_names = {
@@ -367,15 +538,19 @@ class ShopifyCSVGenerator:
             'Option3 Name': ''
         }
         
-        for idx, option_type in enumerate(standard_option_types, 1):
-            standard_names[f'Option{idx} Name'] = option_type
+        for (name_key, _), option_type in zip(_OPTION_KEYS, standard_option_types):
+            standard_names[name_key] = option_type
         
         return standard_names
     
-    def _normalize_option_name(self, name: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _normalize_option_name(name: str) -> str:
         """
         Normalize option names to standard forms.
         
+        Memoized: the same handful of raw names repeats across every variant.
+        
         Examples:
         - "Flavor/Scent" → "Flavor"
         - "Size/Volume" → "Size"
@@ -429,7 +604,7 @@ class ShopifyCSVGenerator:
         options['Option2 Value'] = ''
         options['Option3 Value'] = ''
         
-        if hasattr(variant, 'variants') and variant.variants:
+        if variant.variants:
             # Build a map of normalized names to values from this variant
             variant_map = {}
             for var in variant.variants:
@@ -440,99 +615,39 @@ class ShopifyCSVGenerator:
                     variant_map[normalized_name] = value
             
             # Match each standard option to a value from variant
-            for opt_num in range(1, 4):
-                std_name = standard_option_names.get(f'Option{opt_num} Name', '').strip()
+            for name_key, value_key in _OPTION_KEYS:
+                std_name = standard_option_names.get(name_key, '').strip()
                 if std_name and std_name in variant_map:
-                    options[f'Option{opt_num} Value'] = variant_map[std_name]
+                    options[value_key] = variant_map[std_name]
                 # If std_name not in variant_map, value stays empty
         
         return options
     
+    def _build_base_row(self, fields: Dict) -> List:
+        """Lay out a column-name -> value dict as a positional row template"""
+        row = self._ROW_TEMPLATE.copy()
+        col_index = self._COL_INDEX
+        for col, value in fields.items():
+            row[col_index[col]] = value
+        return row
+    
     def _create_variant_row(
         self,
-        shared_data: Dict,
+        base_row: List,
         variant: ProductData,
-        variant_options: Dict,
-        image_url: Optional[str] = None,
-        image_position: Optional[int] = None,
-        is_first: bool = True
-    ) -> Dict:
-        """Create a single CSV row for a variant"""
-        row = shared_data.copy()
-        
-        # Variant options (from Claude extraction)
-        for i in range(1, 4):
-            row[f'Option{i} Name'] = variant_options.get(f'Option{i} Name', '')
-            row[f'Option{i} Value'] = variant_options.get(f'Option{i} Value', '')
-            row[f'Option{i} Linked To'] = ''  # Always empty for standard Shopify imports
-        
-        # SKU and inventory (only on first row per variant)
-        if is_first:
-            row['Variant SKU'] = variant.upc_code
-            row['Variant Grams'] = ''
-            row['Variant Inventory Tracker'] = 'shopify'
-            row['Variant Inventory Policy'] = 'continue'
-            row['Variant Fulfillment Service'] = 'manual'
-            row['Variant Barcode'] = variant.upc_code
-        else:
-            row['Variant SKU'] = ''
-            row['Variant Grams'] = ''
-            row['Variant Inventory Tracker'] = ''
-            row['Variant Inventory Policy'] = ''
-            row['Variant Fulfillment Service'] = ''
-            row['Variant Barcode'] = ''
-        
-        # Pricing
-        row['Variant Price'] = float(variant.price)
-        row['Variant Compare At Price'] = ''
-        row['Variant Requires Shipping'] = 'TRUE'
-        row['Variant Taxable'] = 'TRUE'
-        
-        # Unit pricing (empty for now)
-        row['Unit Price Total Measure'] = ''
-        row['Unit Price Total Measure Unit'] = ''
-        row['Unit Price Base Measure'] = ''
-        row['Unit Price Base Measure Unit'] = ''
-        
-        # Image
-        row['Image Src'] = image_url if image_url else ''
-        row['Image Position'] = image_position if image_position else ''
-        row['Image Alt Text'] = f"{variant.brand} {variant.name}" if image_url else ''
-        
-        # Additional required fields
-        row['Gift Card'] = 'FALSE'
-        row['SEO Title'] = ''
-        row['SEO Description'] = ''
-        
-        # Benefit metafields - only set if not already set
-        if 'Allergy Information (product.metafields.custom.allergy_information)' not in row:
-            row['Allergy Information (product.metafields.custom.allergy_information)'] = ''
-        if 'Benefits (product.metafields.custom.benefits)' not in row:
-            row['Benefits (product.metafields.custom.benefits)'] = ''
-        if 'Custom Ingredients (product.metafields.custom.custom_ingredients)' not in row:
-            row['Custom Ingredients (product.metafields.custom.custom_ingredients)'] = ''
-        if 'Good For (product.metafields.custom.good_for)' not in row:
-            row['Good For (product.metafields.custom.good_for)'] = ''
-        if 'Suggested Usage (product.metafields.custom.suggested_use)' not in row:
-            row['Suggested Usage (product.metafields.custom.suggested_use)'] = ''
-        
-        # Google Shopping fields (empty)
-        row['Google Shopping / Google Product Category'] = ''
-        row['Google Shopping / Gender'] = ''
-        row['Google Shopping / Age Group'] = ''
-        row['Google Shopping / MPN'] = ''
-        row['Google Shopping / Condition'] = ''
-        row['Google Shopping / Custom Product'] = ''
-        row['Google Shopping / Custom Label 0'] = ''
-        row['Google Shopping / Custom Label 1'] = ''
-        row['Google Shopping / Custom Label 2'] = ''
-        row['Google Shopping / Custom Label 3'] = ''
-        row['Google Shopping / Custom Label 4'] = ''
-        
-        # Variant specific fields
-        row['Variant Image'] = ''
-        row['Variant Weight Unit'] = ''
-        row['Variant Tax Code'] = ''
-        row['Cost per item'] = ''
+        variant_options: Dict
+    ) -> List:
+        """Create the fields shared by every CSV row of a variant (options, price)"""
+        # Start from the prebuilt template (shared fields already in place);
+        # only fields with a value need to be set below
+        row = base_row.copy()
+        
+        # Variant options (from Claude extraction); 'Option* Linked To' stays empty
+        for (name_key, value_key), (name_idx, value_idx) in zip(_OPTION_KEYS, self._IDX_OPTIONS):
+            row[name_idx] = variant_options.get(name_key, '')
+            row[value_idx] = variant_options.get(value_key, '')
+        
+        # Pricing ('Variant Requires Shipping' / 'Variant Taxable' come from _ROW_TEMPLATE)
+        row[self._IDX_PRICE] = float(variant.price)
         
         return row
@@ -2,19 +2,39 @@
 Module 2: Tavily Searcher
 Search for product URLs using Tavily API.
 """
+import atexit
+import functools
 import logging
 import time
 import json
 import hashlib
+import re
+import threading
 import requests
-from typing import Optional, Dict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
 from pathlib import Path
 from urllib.parse import urlparse
 
 from config import TAVILY_API_KEY, API_CONFIG, CACHE_DIR, DOMAIN_PRIORITY
 
+# orjson (optional) parses the cache log and API responses several times faster
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Result URLs containing any of these (in any case) are not product pages
+_SKIP_URL_PATTERNS = [
+    'login', 'signin', 'account', 'cart', 'checkout', 'register',
+    '/shop/', '/category/', '/collection/', '/search', '/brands/'
+]
+_RE_SKIP_URL = re.compile('|'.join(re.escape(p) for p in _SKIP_URL_PATTERNS), re.IGNORECASE)
+
 
 class TavilySearcher:
     """
@@ -23,9 +43,11 @@ class TavilySearcher:
     Features:
     - Domain prioritization (brand sites → retailers)
     - Exponential backoff retry logic
-    - JSON caching with auto-save
+    - Append-only JSONL cache (misses cached with a TTL)
     - Rate limiting
     - URL validation
+    - Concurrent batch search
+    - Pooled keep-alive connection to the Tavily API
     """
     
     def __init__(self, api_key: str = None):
@@ -39,11 +61,50 @@ class TavilySearcher:
         self.max_retries = self.config['max_retries']
         self.rate_limit_delay = self.config['rate_limit_delay']
         self.max_results = self.config['max_results']
+        self.batch_workers = max(self.config.get('batch_workers', 8), 1)
+        self.parallel_queries = self.config.get('parallel_queries', False)
+        self.miss_ttl = self.config.get('miss_ttl_days', 30) * 86400
+        
+        # One session for all searches so the TCP + TLS handshake to the API host is
+        # paid once. The adapter also owns retries: timeouts, 429 and 5xx answers are
+        # retried with exponential backoff (honouring Retry-After)
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
-        # Cache setup
-        self.cache_file = Path(CACHE_DIR) / 'tavily_cache.json'
+        # Cache setup: new entries are appended to a JSONL log (one line each)
+        # instead of rewriting the whole file; the old JSON file is migrated once
+        self.cache_file = Path(CACHE_DIR) / 'tavily_cache.jsonl'
+        self.legacy_cache_file = Path(CACHE_DIR) / 'tavily_cache.json'
         self.cache = self._load_cache()
         
+        # Long-lived append handle, opened on first write and flushed every
+        # cache_save_every entries (and on close)
+        self._handle = None
+        self._save_every = self.config.get('cache_save_every', 50)
+        self._unsaved = 0
+        atexit.register(self.close)
+        
+        # Searches may run on a thread pool (search_urls_batch): request starts are
+        # spaced rate_limit_delay / batch_workers apart and cache writes serialized
+        self._request_interval = self.rate_limit_delay / self.batch_workers
+        self._next_request_at = 0.0
+        self._rate_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        
+        # Cache keys being searched right now -> event set when the result is stored
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        
         logger.info("TavilySearcher initialized")
     
     def search_url(self, brand: str, product_name: str, upc_code: str = None) -> Optional[str]:
@@ -69,17 +130,89 @@ class TavilySearcher:
         
         # Check cache first (include UPC in cache key)
         cache_key = self._generate_cache_key(brand, product_name, upc_code)
-        cached_url = self.cache.get(cache_key)
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            cached = self._migrate_legacy_entry(cache_key)
+        
+        if isinstance(cached, str):
+            logger.debug("Cache hit: %s - %s", brand, product_name)
+            return cached
+        
+        # Known miss from an earlier run: don't spend 5 searches on it again until it expires
+        if isinstance(cached, dict) and time.time() - cached.get('miss_at', 0) < self.miss_ttl:
+            logger.debug("Cached miss: %s - %s", brand, product_name)
+            return None
+        
+        # Another worker may already be searching this product (same cache key):
+        # wait for its result instead of sending the same queries again
+        with self._inflight_lock:
+            done = self._inflight.get(cache_key)
+            is_owner = done is None
+            if is_owner:
+                done = self._inflight[cache_key] = threading.Event()
+        
+        if not is_owner:
+            done.wait()
+            cached = self.cache.get(cache_key)
+            return cached if isinstance(cached, str) else None
+        
+        try:
+            url = self._search_uncached(brand, product_name)
+            if url:
+                self._store(cache_key, url)
+                return url
+            
+            self._store(cache_key, {'miss_at': time.time()})
+            return None
+        finally:
+            with self._inflight_lock:
+                del self._inflight[cache_key]
+            done.set()
+    
+    def search_urls_batch(self, queries: List[Tuple[str, ...]]) -> Dict[Tuple[str, ...], Optional[str]]:
+        """
+        Search URLs for many products concurrently.
+        
+        Args:
+            queries: (brand, product_name) or (brand, product_name, upc_code) tuples
+            
+        Returns:
+            Dict mapping each query tuple to its URL (None if not found)
+        """
+        unique_queries = list(dict.fromkeys(queries))
+        if not unique_queries:
+            return {}
         
-        if cached_url:
-            logger.debug(f"Cache hit: {brand} - {product_name}")
-            return cached_url
+        workers = min(self.batch_workers, len(unique_queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            urls = executor.map(lambda q: self.search_url(*q), unique_queries)
+            return dict(zip(unique_queries, urls))
+    
+    def close(self):
+        """Flush and close the cache log and the HTTP session"""
+        with self._cache_lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+                self._unsaved = 0
+        self.session.close()
+    
+    def _search_uncached(self, brand: str, product_name: str) -> Optional[str]:
+        """
+        Run the multi-retailer query strategy for one product (no cache).
         
+        Args:
+            brand: Product brand name (stripped)
+            product_name: Product name (stripped)
+            
+        Returns:
+            First valid URL by query priority, None if no query found one
+        """
         # Multi-retailer search strategy (Brand website FIRST, then retailers)
         search_queries = []
         
         # Strategy 1: Brand's own website (most likely to have exact product)
-        brand_clean = brand.lower().replace(' ', '').replace('-', '')
+        brand_clean = self._brand_slug(brand)
         search_queries.append(f'site:{brand_clean}.com "{product_name}"')
         search_queries.append(f'site:{brand_clean}.sa "{product_name}"')
         search_queries.append(f'site:{brand_clean}.ae "{product_name}"')
@@ -90,23 +223,35 @@ class TavilySearcher:
         # Strategy 3: Regional retailers (Amazon SA, Noon, etc.) with brand + product
         search_queries.append(f'"{brand}" "{product_name}" site:amazon.sa OR site:noon.com OR site:namshi.com')
         
-        # Try each query until we find a valid result
         url = None
-        for query_idx, query in enumerate(search_queries):
-            logger.info(f"Search attempt {query_idx + 1}/{len(search_queries)}: {query}")
-            url = self._execute_search(query, brand)
-            if url:
-                break
+        if self.parallel_queries:
+            # Send every query at once; results keep query order, so the brand
+            # site still wins over retailers when several queries hit
+            logger.info("Searching %d queries in parallel: %s - %s", len(search_queries), brand, product_name)
+            with ThreadPoolExecutor(max_workers=len(search_queries)) as executor:
+                results = executor.map(lambda q: self._execute_search(q, brand), search_queries)
+                url = next((u for u in results if u), None)
+        else:
+            # Try each query until we find a valid result
+            for query_idx, query in enumerate(search_queries):
+                logger.info("Search attempt %d/%d: %s", query_idx + 1, len(search_queries), query)
+                url = self._execute_search(query, brand)
+                if url:
+                    break
         
-        if url:
-            self.cache[cache_key] = url
-            self._save_cache()
-            return url
+        if not url:
+            logger.debug("No results found after %d search attempts", len(search_queries))
+        return url
+    
+    def _wait_for_rate_slot(self):
+        """Sleep until the next request may start (shared across worker threads)"""
+        with self._rate_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at)
+            self._next_request_at = start_at + self._request_interval
         
-        logger.debug(f"No results found after {len(search_queries)} search attempts")
-        self.cache[cache_key] = None
-        self._save_cache()
-        return None
+        if start_at > now:
+            time.sleep(start_at - now)
     
     def _execute_search(self, query: str, brand: str) -> Optional[str]:
         """
@@ -122,98 +267,82 @@ class TavilySearcher:
         # Generate domain list
         domains = self._get_priority_domains(brand)
         
-        # API call with retry
-        for attempt in range(1, self.max_retries + 1):
-            try:
-                payload = {
-                    "api_key": self.api_key,
-                    "query": query,
-                    "max_results": self.max_results,
-                    "include_domains": domains,
-                    "search_depth": self.config.get('search_depth', 'basic')
-                }
-                
-                response = requests.post(
-                    self.endpoint,
-                    json=payload,
-                    timeout=self.timeout
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get('results', [])
-                    
-                    if results:
-                        # Filter out unwanted pages
-                        skip_patterns = [
-                            'login', 'signin', 'account', 'cart', 'checkout', 'register',
-                            '/shop/', '/category/', '/collection/', '/search', '/brands/'
-                        ]
-                        
-                        filtered_results = [
-                            r for r in results
-                            if not any(skip in r.get('url', '').lower() for skip in skip_patterns)
-                        ]
-                        
-                        if filtered_results:
-                            url = filtered_results[0].get('url', '')
-                        elif results:
-                            # Fallback to first result if all filtered out
-                            url = results[0].get('url', '')
-                        else:
-                            url = ''
-                        
-                        # Validate URL
-                        if url and self._validate_url(url):
-                            logger.info(f"✓ Found: {url}")
-                            
-                            # Rate limiting
-                            time.sleep(self.rate_limit_delay)
-                            return url
-                    
-                    logger.debug(f"No results for: {query}")
-                    return None
-                
-                elif response.status_code == 429:
-                    wait_time = 2 ** attempt
-                    logger.warning(f"Rate limited. Waiting {wait_time}s (attempt {attempt}/{self.max_retries})...")
-                    time.sleep(wait_time)
-                    continue
+        payload = {
+            "api_key": self.api_key,
+            "query": query,
+            "max_results": self.max_results,
+            "include_domains": domains,
+            "search_depth": self.config.get('search_depth', 'basic')
+        }
+        
+        try:
+            self._wait_for_rate_slot()
+            response = self.session.post(
+                self.endpoint,
+                json=payload,
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            # Raised once the adapter's retries are used up
+            logger.warning("Search failed after %d retries: %s (%s)", self.max_retries, query, e)
+            return None
+        
+        try:
+            if response.status_code != 200:
+                logger.error("API error %s: %s", response.status_code, response.text[:200])
+                return None
+            
+            data = _json_loads(response.content)
+            results = data.get('results', [])
+            
+            if results:
+                # Filter out unwanted pages (one case-insensitive scan per URL)
+                filtered_results = [
+                    r for r in results
+                    if not _RE_SKIP_URL.search(r.get('url', ''))
+                ]
                 
+                if filtered_results:
+                    url = filtered_results[0].get('url', '')
                 else:
-                    logger.error(f"API error {response.status_code}: {response.text[:200]}")
-                    return None
-                    
-            except requests.Timeout:
-                logger.warning(f"Timeout on attempt {attempt}/{self.max_retries}")
-                if attempt < self.max_retries:
-                    time.sleep(2 ** attempt)
-                continue
+                    # Fallback to first result if all filtered out
+                    url = results[0].get('url', '')
                 
-            except Exception as e:
-                logger.error(f"Search failed: {str(e)}")
-                return None
-        
-        logger.warning(f"Search failed after {self.max_retries} attempts: {query}")
-        return None
+                # Validate URL
+                if url and self._validate_url(url):
+                    logger.info("✓ Found: %s", url)
+                    return url
+            
+            logger.debug("No results for: %s", query)
+            return None
+            
+        except Exception as e:
+            logger.error("Search failed: %s", e)
+            return None
     
-    def _get_priority_domains(self, brand: str) -> list:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _brand_slug(brand: str) -> str:
+        """Brand name as used in domain names (memoized per brand)"""
+        return brand.lower().replace(' ', '').replace('-', '')
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _get_priority_domains(brand: str) -> tuple:
         """
-        Generate prioritized domain list for search.
+        Generate prioritized domain list for search (memoized per brand).
         
         Args:
             brand: Brand name
             
         Returns:
-            List of domains to prioritize in search
+            Tuple of domains to prioritize in search
         """
         # Clean brand name for domain generation
-        brand_domain = brand.lower().replace(' ', '').replace('-', '')
+        brand_domain = TavilySearcher._brand_slug(brand)
         
         # Format domain templates
-        domains = [d.format(brand_domain=brand_domain) for d in DOMAIN_PRIORITY]
-        
-        return domains
+        return tuple(d.format(brand_domain=brand_domain) for d in DOMAIN_PRIORITY)
     
     def _validate_url(self, url: str) -> bool:
         """
@@ -228,9 +357,18 @@ class TavilySearcher:
         if not url or not isinstance(url, str):
             return False
         
-        if not url.startswith(('http://', 'https://')):
+        if url.startswith('https://'):
+            host_start = 8
+        elif url.startswith('http://'):
+            host_start = 7
+        else:
             return False
         
+        # Fast path for the usual API result: the host starts right after '//'
+        # (brackets excluded, urlparse validates those as IPv6 literals)
+        if url[host_start:host_start + 1].isalnum() and '[' not in url and ']' not in url:
+            return True
+        
         try:
             result = urlparse(url)
             return all([result.scheme, result.netloc])
@@ -247,35 +385,99 @@ class TavilySearcher:
             upc_code: UPC code (optional)
             
         Returns:
-            MD5 hash of brand|product|upc
+            brand|product|upc (lowercased), used directly as the dict key
         """
         if upc_code:
-            key = f"{brand.lower()}|{product.lower()}|{upc_code}"
-        else:
-            key = f"{brand.lower()}|{product.lower()}"
-        return hashlib.md5(key.encode()).hexdigest()
+            return f"{brand.lower()}|{product.lower()}|{upc_code}"
+        return f"{brand.lower()}|{product.lower()}"
+    
+    def _migrate_legacy_entry(self, cache_key: str):
+        """
+        Look up an entry stored under the old MD5-hashed key.
+        
+        Caches written before keys were plain strings are still honoured; a hit
+        is moved to the new key so it is only hashed once.
+        
+        Returns:
+            The cached value, or None if there is no legacy entry
+        """
+        legacy_key = hashlib.md5(cache_key.encode()).hexdigest()
+        cached = self.cache.pop(legacy_key, None)
+        if cached is not None:
+            self._store(cache_key, cached)
+        return cached
     
     def _load_cache(self) -> Dict:
-        """Load cache from file"""
+        """
+        Load cache by replaying the JSONL log (later lines win).
+        
+        On first use the old single-JSON cache is converted to the log and
+        renamed to *.json.migrated. A log with many superseded lines is
+        compacted while loading.
+        """
+        cache = {}
+        
         if self.cache_file.exists():
+            line_count = 0
+            try:
+                with open(self.cache_file, 'rb') as f:
+                    for line in f:
+                        line_count += 1
+                        try:
+                            entry = _json_loads(line)
+                            cache[entry['k']] = entry['v']
+                        except (ValueError, KeyError, TypeError):
+                            # Torn line from an interrupted write
+                            continue
+            except Exception as e:
+                logger.error("Cache load failed: %s", e)
+                return {}
+            
+            if line_count > 2 * len(cache) + 100:
+                self._rewrite_cache(cache)
+        
+        elif self.legacy_cache_file.exists():
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                with open(self.legacy_cache_file, 'r', encoding='utf-8') as f:
                     cache = json.load(f)
-                    logger.debug(f"Loaded {len(cache)} cached URLs")
-                    return cache
             except Exception as e:
-                logger.error(f"Cache load failed: {e}")
+                logger.error("Cache load failed: %s", e)
                 return {}
-        return {}
+            
+            if self._rewrite_cache(cache):
+                self.legacy_cache_file.rename(self.legacy_cache_file.with_suffix('.json.migrated'))
+                logger.info("Migrated %d cached URLs to %s", len(cache), self.cache_file.name)
+        
+        logger.debug("Loaded %d cached URLs", len(cache))
+        return cache
     
-    def _save_cache(self):
-        """Save cache to file"""
+    def _store(self, cache_key: str, value):
+        """Cache a search result and append it to the cache log"""
+        line = json.dumps({'k': cache_key, 'v': value}, ensure_ascii=False) + '\n'
+        with self._cache_lock:
+            self.cache[cache_key] = value
+            try:
+                if self._handle is None:
+                    self._handle = open(self.cache_file, 'a', encoding='utf-8')
+                
+                self._handle.write(line)
+                self._unsaved += 1
+                if self._unsaved >= self._save_every:
+                    self._handle.flush()
+                    self._unsaved = 0
+            except Exception as e:
+                logger.error("Cache save failed: %s", e)
+    
+    def _rewrite_cache(self, cache: Dict) -> bool:
+        """Write the full cache as a fresh log (atomic, via temp file)"""
         try:
-            # Atomic write using temp file
             temp_file = self.cache_file.with_suffix('.tmp')
             with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
+                for key, value in cache.items():
+                    f.write(json.dumps({'k': key, 'v': value}, ensure_ascii=False) + '\n')
             temp_file.replace(self.cache_file)
-            logger.debug(f"Saved {len(self.cache)} URLs to cache")
+            logger.debug("Compacted cache log to %d entries", len(cache))
+            return True
         except Exception as e:
-            logger.error(f"Cache save failed: {e}")
+            logger.error("Cache save failed: %s", e)
+            return False
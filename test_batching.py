@@ -2,26 +2,39 @@
 Test script to verify batching logic splits files correctly
 """
 import csv
+import sys
 from pathlib import Path
 
+def batching_plan(total_rows, records_per_file=1000):
+    """
+    Compute how rows are split across part files.
+    
+    Returns:
+        List of (start_idx, end_idx, filename) per file, end_idx exclusive
+    """
+    return [
+        (start_idx, min(start_idx + records_per_file, total_rows),
+         f"shopify_products_part{file_idx + 1:03d}.csv")
+        for file_idx, start_idx in enumerate(range(0, total_rows, records_per_file))
+    ]
+
 def simulate_batching(total_rows, records_per_file=1000):
     """Simulate the batching logic"""
-    num_files = (total_rows + records_per_file - 1) // records_per_file
+    plan = batching_plan(total_rows, records_per_file)
     
-    print(f"Total rows: {total_rows}")
-    print(f"Records per file: {records_per_file}")
-    print(f"Number of files needed: {num_files}")
-    print()
+    lines = [
+        f"Total rows: {total_rows}",
+        f"Records per file: {records_per_file}",
+        f"Number of files needed: {len(plan)}",
+        "",
+    ]
+    for file_idx, (start_idx, end_idx, filename) in enumerate(plan):
+        lines.append(f"File {file_idx + 1}: {filename}")
+        lines.append(f"  Rows {start_idx + 1}-{end_idx} ({end_idx - start_idx} records)")
+        lines.append("")
     
-    for file_idx in range(num_files):
-        start_idx = file_idx * records_per_file
-        end_idx = min(start_idx + records_per_file, total_rows)
-        num_records = end_idx - start_idx
-        
-        filename = f"shopify_products_part{file_idx + 1:03d}.csv"
-        print(f"File {file_idx + 1}: {filename}")
-        print(f"  Rows {start_idx + 1}-{end_idx} ({num_records} records)")
-        print()
+    # One write per scenario instead of a print per line
+    sys.stdout.write("\n".join(lines) + "\n")
 
 # Test scenarios
 print("=" * 80)
@@ -8,13 +8,53 @@ Checks all Shopify import requirements:
 """
 import csv
 import sys
-from collections import defaultdict, Counter
+
+from validate_options import check_option_groups
 
 def validate_complete(csv_file):
     """Complete validation for Shopify import readiness"""
     
+    required_fields = ['Handle', 'Title', 'Vendor', 'Variant Price']
+    
+    # One streaming pass collects everything the validations need; option names
+    # are checked per product as its rows go by, rows themselves are not kept
+    categories = set()
+    value_problems = []    # (row number, option number, value)
+    missing_problems = []  # (row number, missing field names)
+    
     with open(csv_file, 'r', encoding='utf-8') as f:
-        rows = list(csv.DictReader(f))
+        reader = csv.reader(f)
+        header = next(reader, [])
+        width = len(header)
+        col = {name: idx for idx, name in enumerate(header)}
+        
+        idx_handle = col['Handle']
+        idx_category = col['Product Category']
+        idx_options = [(col[f'Option{n} Name'], col[f'Option{n} Value']) for n in range(1, 4)]
+        idx_required = [(name, col.get(name)) for name in required_fields]
+        
+        def scan_rows():
+            """Per-row checks; yields (handle, option names) for the option check"""
+            for row_num, row in enumerate(filter(None, reader), 1):
+                if len(row) < width:
+                    row += [''] * (width - len(row))
+                
+                category = row[idx_category]
+                if category:
+                    categories.add(category)
+                
+                for opt_num, (name_idx, value_idx) in enumerate(idx_options, 1):
+                    value = row[value_idx]
+                    if value and not row[name_idx]:
+                        value_problems.append((row_num, opt_num, value))
+                
+                missing = [name for name, idx in idx_required if idx is None or not row[idx]]
+                if missing:
+                    missing_problems.append((row_num, missing))
+                
+                yield row[idx_handle], tuple(sys.intern(row[name_idx]) for name_idx, _ in idx_options)
+        
+        product_count, row_count, option_failures = check_option_groups(scan_rows(), csv_file)
     
     print("=" * 80)
     print("SHOPIFY CSV COMPLETE VALIDATION")
@@ -27,8 +67,6 @@ def validate_complete(csv_file):
     print("\n📋 VALIDATION 1: Product Category Format")
     print("-" * 80)
     
-    categories = set(r['Product Category'] for r in rows if r['Product Category'])
-    
     for cat in categories:
         if '>' in cat:
             print(f"  ✓ {cat}")
@@ -43,81 +81,43 @@ def validate_complete(csv_file):
     print("\n📋 VALIDATION 2: Option Name Consistency (Rule 1)")
     print("-" * 80)
     
-    handles = defaultdict(list)
-    for row in rows:
-        handles[row['Handle']].append(row)
+    for handle, _, problems in option_failures:
+        print(f"  ✗ {handle[:60]}...")
+        for opt_num, option_names in problems:
+            print(f"     Option{opt_num} Names: {option_names}")
+        errors.append(f"Inconsistent option names: {handle}")
     
-    option_errors = 0
-    for handle, variants in handles.items():
-        opt1_names = set(v['Option1 Name'] for v in variants)
-        opt2_names = set(v['Option2 Name'] for v in variants)
-        opt3_names = set(v['Option3 Name'] for v in variants)
-        
-        opt1_names.discard('')
-        opt2_names.discard('')
-        opt3_names.discard('')
-        
-        is_consistent = (
-            len(opt1_names) <= 1 and 
-            len(opt2_names) <= 1 and 
-            len(opt3_names) <= 1
-        )
-        
-        if not is_consistent:
-            print(f"  ✗ {handle[:60]}...")
-            if len(opt1_names) > 1:
-                print(f"     Option1 Names: {opt1_names}")
-            if len(opt2_names) > 1:
-                print(f"     Option2 Names: {opt2_names}")
-            if len(opt3_names) > 1:
-                print(f"     Option3 Names: {opt3_names}")
-            option_errors += 1
-            errors.append(f"Inconsistent option names: {handle}")
-    
-    if option_errors == 0:
-        print(f"  ✓ All {len(handles)} products have consistent option names")
+    if not option_failures:
+        print(f"  ✓ All {product_count} products have consistent option names")
     
     # === VALIDATION 3: Option Value Validation ===
     print("\n📋 VALIDATION 3: Option Name/Value Pairing")
     print("-" * 80)
     
-    value_errors = 0
-    for i, row in enumerate(rows, 1):
-        for opt_num in range(1, 4):
-            name = row[f'Option{opt_num} Name']
-            value = row[f'Option{opt_num} Value']
-            
-            if not name and value:
-                print(f"  ✗ Row {i}: Option{opt_num} has value '{value}' but no name")
-                value_errors += 1
-                errors.append(f"Row {i}: Empty Option{opt_num} Name with value")
+    for i, opt_num, value in value_problems:
+        print(f"  ✗ Row {i}: Option{opt_num} has value '{value}' but no name")
+        errors.append(f"Row {i}: Empty Option{opt_num} Name with value")
     
-    if value_errors == 0:
-        print(f"  ✓ All {len(rows)} rows have valid option name/value pairs")
+    if not value_problems:
+        print(f"  ✓ All {row_count} rows have valid option name/value pairs")
     
     # === VALIDATION 4: Required Fields ===
     print("\n📋 VALIDATION 4: Required Fields")
     print("-" * 80)
     
-    required_fields = ['Handle', 'Title', 'Vendor', 'Variant Price']
-    missing_count = 0
-    
-    for i, row in enumerate(rows, 1):
-        missing = [f for f in required_fields if not row.get(f)]
-        if missing:
-            print(f"  ✗ Row {i}: Missing {', '.join(missing)}")
-            missing_count += 1
-            errors.append(f"Row {i}: Missing required fields")
+    for i, missing in missing_problems:
+        print(f"  ✗ Row {i}: Missing {', '.join(missing)}")
+        errors.append(f"Row {i}: Missing required fields")
     
-    if missing_count == 0:
+    if not missing_problems:
         print(f"  ✓ All rows have required fields")
     
     # === SUMMARY ===
     print("\n" + "=" * 80)
     print("VALIDATION SUMMARY")
     print("=" * 80)
-    print(f"Total products: {len(handles)}")
-    print(f"Total rows: {len(rows)}")
+    print(f"Total products: {product_count}")
+    print(f"Total rows: {row_count}")
     print(f"Errors: {len(errors)}")
     print(f"Warnings: {len(warnings)}")
     
@@ -5,62 +5,136 @@ This implements Rule 1 from fixer.instructions.md.
 """
 import csv
 import sys
+from itertools import groupby
+from operator import itemgetter
 
-def validate_option_consistency(csv_file):
-    """Check that all variants of same product have identical Option Names"""
+def find_inconsistent_option_names(variants):
+    """
+    Check that each Option Name is the same on every variant of a product
+    (empty names are ignored).
+    
+    Args:
+        variants: (Option1 Name, Option2 Name, Option3 Name) tuple per row
+        
+    Returns:
+        List of (option number, set of names) for inconsistent options, empty if consistent
+    """
+    first = variants[0]
+    seen = list(first)
+    consistent = True
     
+    # Single pass, no sets: rows usually repeat the first row's names exactly
+    for names in variants:
+        if names == first:
+            continue
+        for i, name in enumerate(names):
+            if not name:
+                continue
+            if not seen[i]:
+                seen[i] = name
+            elif seen[i] != name:
+                consistent = False
+    
+    if consistent:
+        return []
+    
+    # Rare path: rebuild the name sets for the error report
+    problems = []
+    for i in range(3):
+        option_names = set(v[i] for v in variants)
+        option_names.discard('')
+        if len(option_names) > 1:
+            problems.append((i + 1, option_names))
+    return problems
+
+def read_option_names(csv_file):
+    """Yield (handle, option names tuple) for each data row of a Shopify CSV"""
     with open(csv_file, 'r', encoding='utf-8') as f:
-        rows = list(csv.DictReader(f))
+        reader = csv.reader(f)
+        header = next(reader, [])
+        col = {name: idx for idx, name in enumerate(header)}
+        idx_handle = col['Handle']
+        idx_names = [col[f'Option{n} Name'] for n in range(1, 4)]
+        
+        for row in reader:
+            if not row:
+                continue
+            yield row[idx_handle], tuple(sys.intern(row[idx]) if idx < len(row) else '' for idx in idx_names)
+
+def check_option_groups(rows, csv_file):
+    """
+    Run the option name consistency check product by product.
+    
+    Variants of a product are normally contiguous (Shopify export order), so each
+    product is checked as soon as its rows end instead of grouping the whole file.
+    If a handle turns up again later, the file is re-read and grouped by handle.
+    
+    Args:
+        rows: (handle, option names) per data row, in file order
+        csv_file: CSV path, re-read for the grouped fallback
+        
+    Returns:
+        (product count, row count, [(handle, variant rows, problems)] for failing products)
+    """
+    seen = set()
+    row_count = 0
+    failures = []
+    
+    for handle, group in groupby(rows, key=itemgetter(0)):
+        variants = [names for _, names in group]
+        if handle in seen:
+            # Rows of this product are split up: drain the stream (callers may do
+            # per-row work in it), then fall back to grouping by handle
+            for _ in rows:
+                pass
+            return _check_grouped(read_option_names(csv_file))
+        
+        seen.add(handle)
+        row_count += len(variants)
+        problems = find_inconsistent_option_names(variants)
+        if problems:
+            failures.append((handle, len(variants), problems))
     
-    # Group by Handle
+    return len(seen), row_count, failures
+
+def _check_grouped(rows):
+    """check_option_groups() for CSVs whose product rows are not contiguous"""
     handles = {}
-    for row in rows:
-        handle = row['Handle']
-        if handle not in handles:
-            handles[handle] = []
-        handles[handle].append(row)
+    row_count = 0
+    for handle, names in rows:
+        handles.setdefault(handle, []).append(names)
+        row_count += 1
+    
+    failures = []
+    for handle, variants in handles.items():
+        problems = find_inconsistent_option_names(variants)
+        if problems:
+            failures.append((handle, len(variants), problems))
+    
+    return len(handles), row_count, failures
+
+def validate_option_consistency(csv_file):
+    """Check that all variants of same product have identical Option Names"""
+    
+    product_count, row_count, failures = check_option_groups(read_option_names(csv_file), csv_file)
     
     print("=" * 80)
     print("SHOPIFY CSV VALIDATION - OPTION NAME CONSISTENCY (Rule 1)")
     print("=" * 80)
     
-    errors = 0
-    warnings = 0
+    for handle, variant_count, problems in failures:
+        print(f"\n❌ ERROR - Product: {handle[:60]}")
+        print(f"   Variants: {variant_count} rows")
+        for opt_num, option_names in problems:
+            print(f"   Option{opt_num} Name INCONSISTENT: {option_names}")
     
-    for handle, variants in handles.items():
-        # Check Option Name consistency
-        opt1_names = set(v['Option1 Name'] for v in variants)
-        opt2_names = set(v['Option2 Name'] for v in variants)
-        opt3_names = set(v['Option3 Name'] for v in variants)
-        
-        # Remove empty strings from sets for cleaner output
-        opt1_names.discard('')
-        opt2_names.discard('')
-        opt3_names.discard('')
-        
-        # Check if consistent
-        is_consistent = (
-            len(opt1_names) <= 1 and 
-            len(opt2_names) <= 1 and 
-            len(opt3_names) <= 1
-        )
-        
-        if not is_consistent:
-            print(f"\n❌ ERROR - Product: {handle[:60]}")
-            print(f"   Variants: {len(variants)} rows")
-            if len(opt1_names) > 1:
-                print(f"   Option1 Name INCONSISTENT: {opt1_names}")
-            if len(opt2_names) > 1:
-                print(f"   Option2 Name INCONSISTENT: {opt2_names}")
-            if len(opt3_names) > 1:
-                print(f"   Option3 Name INCONSISTENT: {opt3_names}")
-            errors += 1
+    errors = len(failures)
     
     print("\n" + "=" * 80)
     print("VALIDATION SUMMARY")
     print("=" * 80)
-    print(f"Total products: {len(handles)}")
-    print(f"Total rows: {len(rows)}")
+    print(f"Total products: {product_count}")
+    print(f"Total rows: {row_count}")
     print(f"Errors found: {errors}")
     
     if errors == 0: